@@ -1,12 +1,20 @@
-import pyarrow.csv as csv
-import pyarrow.parquet as pq
+from __future__ import annotations
 import numpy as np
 import logging
 import os
-import pandas as pd
 import concurrent.futures
 import glob
-from typing import List
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterator, List, Tuple
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+# pandas and pyarrow take most of the import time, so they are imported where a file is read
+if TYPE_CHECKING:
+    import pandas as pd
 
 LOGGING_DIR = './logs/optimized_code/'
 
@@ -19,6 +27,9 @@ class CNST:
     COL_NAME = 'value'
     NUM_0 = 0
     NUM_2 = 2
+    NUM_3 = 3
+    NUM_5 = 5
+    NUM_6 = 6
     NUM_10 = 10
     NUM_20 = 20
     NUM_50 = 50
@@ -26,6 +37,15 @@ class CNST:
     NUM_200 = 200
     NUM_1K = 1000
     LOG_SEP = '*'*100
+    CHUNK_ROWS = 1_000_000
+    # peak resident memory per row of the two processing paths, above the worst case measured on 1M rows
+    # (about 1100 and 275 bytes) with the default CHUNK_ROWS
+    PEAK_BYTES_PER_ROW = 1280
+    CHUNKED_PEAK_BYTES_PER_ROW = 320
+    # smallest csv row is one digit and a new line
+    CSV_MIN_BYTES_PER_ROW = 2
+    MB = 1024 * 1024
+    POLL_SECONDS = 0.1
 
 def init_logger( logging_dir: str, file_path: str) -> logging.Logger: 
         """ 
@@ -40,6 +60,279 @@ def init_logger( logging_dir: str, file_path: str) -> logging.Logger:
         return logger
 
 
+def split_rows_into_chunks(num_rows: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    - Splits the rows of a table into consecutive [start, stop) row ranges of at most chunk_size rows.
+
+    Args:
+        num_rows (int): number of rows in the table
+        chunk_size (int): maximum number of rows per chunk
+
+    Returns:
+        (List[Tuple[int, int]]): the (start, stop) global row offsets of every chunk, in order
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive number of rows!")
+    return [(start, min(start + chunk_size, num_rows)) for start in range(0, num_rows, chunk_size)]
+
+
+def count_first_part_entries(values: np.ndarray, start: int, use_row_parity: bool) -> np.ndarray:
+    """
+    - Returns the number of entries every row contributes to the first part of the results array.
+    - Mirrors the rules of ArrowDatasetManipulation.generate_first_part_of_results:
+        __ with row parity (data has more than 50 entries): 1 entry for even rows, 5 entries for odd rows
+        __ without row parity: 1 entry if value<5, 5 entries otherwise
+
+    Args:
+        values (np.ndarray): the "value" column of one chunk
+        start (int): global index of the first row of the chunk, used for the even/odd parity
+        use_row_parity (bool): True if the whole table has more than 50 entries
+
+    Returns:
+        (np.ndarray): number of entries per row of the chunk
+    """
+    if use_row_parity:
+        is_single = (np.arange(start, start + len(values)) % CNST.NUM_2) == CNST.NUM_0
+    else:
+        is_single = values < CNST.NUM_5
+    return np.where(is_single, 1, CNST.NUM_5)
+
+
+def count_second_part_entries(values: np.ndarray) -> np.ndarray:
+    """
+    - Returns the number of entries every row contributes to the second part of the results array.
+    - Mirrors ArrowDatasetManipulation.generate_second_part_of_results: 6 entries if 50<=value<=100, 3 entries otherwise.
+
+    Args:
+        values (np.ndarray): the "value" column of one chunk
+
+    Returns:
+        (np.ndarray): number of entries per row of the chunk
+    """
+    is_pair = (values >= CNST.NUM_50) & (values <= CNST.NUM_100)
+    return np.where(is_pair, CNST.NUM_6, CNST.NUM_3)
+
+
+def scatter_rows(out: np.ndarray, positions: np.ndarray, rows_mask: np.ndarray, entries: np.ndarray):
+    """
+    - Writes a block of per-row entries into out, starting at each selected row's position.
+
+    Args:
+        out (np.ndarray): output slice to be written in place
+        positions (np.ndarray): position in out of the first entry of every row
+        rows_mask (np.ndarray): rows to be written
+        entries (np.ndarray): (n_selected_rows, n_entries_per_row) block of values to write
+    """
+    out[positions[rows_mask][:, None] + np.arange(entries.shape[1])] = entries
+
+
+def fill_first_part_chunk(out: np.ndarray, values: np.ndarray, counts: np.ndarray, use_row_parity: bool):
+    """
+    - Fills the first part of the results array for one chunk, in place.
+    - Follows the same rules as ArrowDatasetManipulation.generate_first_part_of_results.
+
+    Args:
+        out (np.ndarray): the slice of the results array owned by this chunk
+        values (np.ndarray): the "value" column of the chunk
+        counts (np.ndarray): output of count_first_part_entries for the chunk, which already encodes the row parity
+        use_row_parity (bool): True if the whole table has more than 50 entries
+    """
+    positions = np.cumsum(counts) - counts
+    is_single = counts == 1
+    if use_row_parity:
+        out[positions[is_single]] = np.where(values[is_single] > CNST.NUM_10, values[is_single] * CNST.NUM_2, values[is_single] + CNST.NUM_100)
+        odd = values[~is_single]
+        base = np.where(odd < CNST.NUM_100, odd + 1, np.where(odd > CNST.NUM_100, odd - CNST.NUM_2, odd))
+        entries = np.stack([base, odd * 3, base, base, odd * 3], axis=1)
+        scatter_rows(out, positions, ~is_single, entries)
+        return
+
+    out[positions[is_single]] = values[is_single] * CNST.NUM_10
+    rest = values[~is_single]
+    steps = np.where(rest > CNST.NUM_200, 1, -1)[:, None] * np.arange(CNST.NUM_5)
+    scatter_rows(out, positions, ~is_single, rest[:, None] + steps)
+
+
+def fill_second_part_chunk(out: np.ndarray, values: np.ndarray, counts: np.ndarray):
+    """
+    - Fills the second part of the results array for one chunk, in place.
+    - Follows the same rules as ArrowDatasetManipulation.generate_second_part_of_results.
+
+    Args:
+        out (np.ndarray): the slice of the results array owned by this chunk
+        values (np.ndarray): the "value" column of the chunk
+        counts (np.ndarray): output of count_second_part_entries for the chunk
+    """
+    positions = np.cumsum(counts) - counts
+    is_pair = counts == CNST.NUM_6
+    single = values[~is_pair]
+    single = np.where(single > CNST.NUM_100, single * CNST.NUM_2, np.where(single % CNST.NUM_2 == CNST.NUM_0, single + CNST.NUM_10, single - CNST.NUM_10))
+    scatter_rows(out, positions, ~is_pair, np.repeat(single[:, None], CNST.NUM_3, axis=1))
+    pair = values[is_pair]
+    scatter_rows(out, positions, is_pair, np.tile(np.stack([pair + CNST.NUM_20, pair - CNST.NUM_20], axis=1), CNST.NUM_3))
+
+
+def estimate_number_of_rows(path: str) -> int:
+    """
+    - Estimates the number of rows of a data file without loading it.
+        __ parquet: exact number of rows read from the file metadata
+        __ csv: upper bound computed from the file size
+
+    Args:
+        path (str): The path of the data file
+
+    Returns:
+        (int): estimated number of rows
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return os.path.getsize(path) // CNST.CSV_MIN_BYTES_PER_ROW
+
+
+def get_peak_rss() -> int:
+    """
+    - Returns the peak resident memory of the process in bytes, or 0 where it cannot be measured.
+    """
+    if resource is None:
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class MemoryGovernor:
+    """
+    A class that limits the memory used by files processed at the same time.
+    Every file reserves its estimated peak memory before it is loaded, and is only admitted
+    while the total of the reservations fits the budget. A file that is larger than the budget
+    is admitted when no other file is running. Files are admitted in the order they asked.
+    Files larger than the budget are processed with run_manipulation_methods_in_chunks,
+    which still loads the whole file but needs less memory.
+    Attributes:
+        memory_budget (int): maximum memory in bytes to be reserved at the same time
+        reserved (int): memory in bytes currently reserved by running files
+        peak_reserved (int): highest value of reserved, which is the estimated peak
+        start_peak_rss (int): peak resident memory of the process when the governor was created
+    """
+
+    def __init__(self, memory_budget: int):
+        """ 
+        Args:
+            memory_budget (int): maximum memory in bytes to be reserved at the same time
+        """
+        if memory_budget <= 0:
+            raise ValueError("memory_budget must be a positive number of bytes!")
+        self.memory_budget = memory_budget
+        self.reserved = 0
+        self.peak_reserved = 0
+        self.start_peak_rss = get_peak_rss()
+        # files are admitted in the order they asked: every caller takes a ticket, and only the
+        # caller holding the next ticket to be served may be admitted
+        self.next_ticket = 0
+        self.serving_ticket = 0
+        self.condition = threading.Condition()
+
+    def estimate_file_memory(self, path: str) -> Tuple[int, bool]:
+        """ 
+        - Estimates the peak memory needed to process a file.
+        - Files whose estimate is larger than the budget use the chunked path, which needs less memory.
+          The chunked path still loads the whole file, it only avoids the large intermediate columns,
+          so a file whose chunked estimate is also larger than the budget runs alone.
+
+        Args:
+            path (str): The path of the data file
+
+        Returns:
+            (Tuple[int, bool]): estimated peak memory in bytes, and True if the chunked path should be used
+        """
+        num_rows = estimate_number_of_rows(path)
+        if num_rows * CNST.PEAK_BYTES_PER_ROW <= self.memory_budget:
+            return num_rows * CNST.PEAK_BYTES_PER_ROW, False
+        return num_rows * CNST.CHUNKED_PEAK_BYTES_PER_ROW, True
+
+    def acquire(self, estimate: int):
+        """ 
+        - Blocks until all earlier callers are admitted and the estimate fits the budget, then reserves it.
+        - Callers are admitted in first in, first out order, so a file larger than the budget is not
+          overtaken by smaller files that keep fitting.
+
+        Args:
+            estimate (int): memory in bytes to be reserved
+        """
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.condition.wait_for(lambda: self.serving_ticket == ticket and
+                                    (self.reserved == 0 or self.reserved + estimate <= self.memory_budget))
+            self.serving_ticket += 1
+            self.reserved += estimate
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+            # the next caller may fit as well
+            self.condition.notify_all()
+
+    def release(self, estimate: int):
+        """ 
+        - Releases a reservation made with self.acquire.
+
+        Args:
+            estimate (int): memory in bytes to be released
+        """
+        with self.condition:
+            self.reserved -= estimate
+            self.condition.notify_all()
+
+    def report(self) -> str:
+        """ 
+        Returns:
+            (str): the estimated peak memory compared to the actual peak memory of the process
+        """
+        actual_peak_rss = get_peak_rss()
+        return (f'Memory budget: {self.memory_budget / CNST.MB:.1f} MB, '
+                f'estimated peak: {self.peak_reserved / CNST.MB:.1f} MB, '
+                f'actual peak resident memory: {actual_peak_rss / CNST.MB:.1f} MB '
+                f'(increased by {(actual_peak_rss - self.start_peak_rss) / CNST.MB:.1f} MB during the run)')
+
+
+class FileOutcome:
+    """
+    The outcome of processing one file, as yielded by ArrowDatasetManipulation.iterate_dataset_in_parallel.
+    Attributes:
+        file_path (str): path for data file
+        attempts (int): number of times the file was processed, retries included
+        elapsed_seconds (float): processing time of the last attempt
+        completed_run (bool): if True, manipulation has completed
+        indices_matching_filter (List[int]): indices of values that match filter
+        generated_results_data (np.ndarray): results of data manipulation
+        error (Exception): the error of the last attempt, None if the file was processed
+    """
+
+    def __init__(self, file_path: str, attempts: int, elapsed_seconds: float, dataset: 'ArrowDatasetManipulation' = None, error: Exception = None):
+        """ 
+        Args:
+            file_path (str): path for data file
+            attempts (int): number of times the file was processed, retries included
+            elapsed_seconds (float): processing time of the last attempt
+            dataset (ArrowDatasetManipulation): the processed dataset, None if processing failed
+            error (Exception): the error of the last attempt, None if the file was processed
+        """
+        self.file_path = file_path
+        self.attempts = attempts
+        self.elapsed_seconds = elapsed_seconds
+        self.completed_run = dataset is not None and dataset.completed_run
+        self.indices_matching_filter = dataset.indices_matching_filter if dataset is not None else None
+        self.generated_results_data = dataset.generated_results_data if dataset is not None else None
+        self.error = error
+
+    @property
+    def succeeded(self) -> bool:
+        """ 
+        Returns:
+            (bool): True if the file was processed without an error
+        """
+        return self.error is None and self.completed_run
+
+
 class ArrowDatasetManipulation:
     """
     A class for manipulating an Arrow dataset.
@@ -90,9 +383,11 @@ class ArrowDatasetManipulation:
         try: 
             if path.endswith('.csv'):
                 self.logger.info("File is a CSV!")
+                import pyarrow.csv as csv
                 data = csv.read_csv(path)
             elif path.endswith('.parquet'):
                 self.logger.info("File is a Parquet!")
+                import pyarrow.parquet as pq
                 data = pq.read_table(path)
             else: 
                 self.logger.error("Unknown file type!")
@@ -100,7 +395,7 @@ class ArrowDatasetManipulation:
             data = data.to_pandas()
             return data
         except Exception as e:
-                self.logger.error("Error reading file:", e)
+                self.logger.error(f"Error reading file: {e}")
                 raise ValueError("Error reading file:", e)
 
 
@@ -234,6 +529,16 @@ class ArrowDatasetManipulation:
         
         large_values_count = np.sum(self.generated_results_data>CNST.NUM_1K)
         small_values_count = np.sum(self.generated_results_data<CNST.NUM_10)
+        self.write_results_range_counts(large_values_count, small_values_count)
+
+    def write_results_range_counts(self, large_values_count: int, small_values_count: int):
+        """ 
+        - Writes the counts of results within each range to the log, see self.log_results_range_counts
+
+        Args:
+            large_values_count (int): number of results where: result>1000
+            small_values_count (int): number of results where: result<10
+        """
         normal_values_count = self.generated_results_data.shape[0]-large_values_count-small_values_count
         self.logger.info(CNST.LOG_SEP)
         self.logger.info(f"The number of large values detected in the generated results array is {large_values_count}")
@@ -278,21 +583,30 @@ class ArrowDatasetManipulation:
         if not self.table.empty:
             assert CNST.COL_NAME in self.table.columns
             #note: name it logging fucntoin,,, design for testability,, make table passable to function instead
-            self.logger.info(f'There are {len(self.table[self.table["value"]>10])} values that are greater than 10!')
-            self.logger.info(CNST.LOG_SEP)
-
-            self.logger.info(f'There are {len(self.table[(5<self.table["value"])&(self.table["value"]<10)])} values that are greater than 5 but less than 10!')
-            self.logger.info(CNST.LOG_SEP)
-
-            self.logger.info(f'There are {len(self.table[(0<self.table["value"])&(self.table["value"]<5)])} values that are greater than 0 but less than 5!')
-            self.logger.info(CNST.LOG_SEP)
-
-            self.logger.info(f'There are {len(self.table[self.table["value"]<0])} non-positive values!')
-            self.logger.info(CNST.LOG_SEP)
+            self.write_values_range_counts(len(self.table[self.table["value"]>10]),
+                                           len(self.table[(5<self.table["value"])&(self.table["value"]<10)]),
+                                           len(self.table[(0<self.table["value"])&(self.table["value"]<5)]),
+                                           len(self.table[self.table["value"]<0]))
             return
         
         self.logger.warning("No data to check!")
 
+    def write_values_range_counts(self, above_10_count: int, between_5_10_count: int, between_0_5_count: int, negative_count: int):
+        """ 
+        - Writes the counts of values within each range to the log, see self.log_values_range_counts
+        """
+        self.logger.info(f'There are {above_10_count} values that are greater than 10!')
+        self.logger.info(CNST.LOG_SEP)
+
+        self.logger.info(f'There are {between_5_10_count} values that are greater than 5 but less than 10!')
+        self.logger.info(CNST.LOG_SEP)
+
+        self.logger.info(f'There are {between_0_5_count} values that are greater than 0 but less than 5!')
+        self.logger.info(CNST.LOG_SEP)
+
+        self.logger.info(f'There are {negative_count} non-positive values!')
+        self.logger.info(CNST.LOG_SEP)
+
     def run_manipulation_methods(self):
         """ 
         - Runs the methods in the class to perform the required list of manipulation steps.
@@ -311,14 +625,209 @@ class ArrowDatasetManipulation:
         self.logger.warning("No data to process!")
         self.completed_run = True 
 
+    def filter_data_in_chunks(self, executor: concurrent.futures.Executor, chunks: List[Tuple[int, int]], filter_threshold:int =42):
+        """ 
+        - Same as self.filter_data, but every chunk of rows is filtered on the executor.
+        - Chunk indices are global, so the output matches self.filter_data.
+
+        Args:
+            executor (concurrent.futures.Executor): executor that runs the chunks
+            chunks (List[Tuple[int, int]]): (start, stop) row offsets of every chunk
+            filter_threshold (int): A number that represents the filter threshold value.
+
+        Updates:
+            self.indices_matching_filter: Class variable that is a list carrying indices
+                                          of data less than specified threshold.
+        """
+        self.logger.info(CNST.LOG_SEP)
+        self.logger.info(f"Filtering data with a value less than {filter_threshold} in {len(chunks)} chunks")
+        assert CNST.COL_NAME in self.table.columns
+        values = self.table[CNST.COL_NAME].to_numpy()
+        index = self.table.index.to_numpy()
+
+        def filter_chunk(chunk):
+            start, stop = chunk
+            return index[start:stop][values[start:stop] < filter_threshold]
+
+        self.indices_matching_filter = []
+        for chunk_indices in executor.map(filter_chunk, chunks):
+            self.indices_matching_filter.extend(chunk_indices.tolist())
+
+    def add_level_column_in_chunks(self, executor: concurrent.futures.Executor, chunks: List[Tuple[int, int]]):
+        """ 
+        - Same as self.add_level_column, but the levels of every chunk of rows are computed on the executor.
+        - Chunks compute integer level codes, and the column is built from them as a categorical column
+          with the same values, so no step creates a Python string per row.
+
+        Args:
+            executor (concurrent.futures.Executor): executor that runs the chunks
+            chunks (List[Tuple[int, int]]): (start, stop) row offsets of every chunk
+
+        Updates:
+            self.table: The dataset table is updated to contain the added column, "Level".
+        """
+        self.logger.info(CNST.LOG_SEP)
+        self.logger.info(f"Adding level column to the data in {len(chunks)} chunks.")
+        assert 'Level' not in self.table.columns
+        import pandas as pd
+        values = self.table[CNST.COL_NAME].to_numpy()
+        # 0: Low, 1: Medium, 2: High
+        level_codes = np.empty(len(values), dtype=np.int8)
+
+        def level_chunk(chunk):
+            start, stop = chunk
+            chunk_values = values[start:stop]
+            np.add(chunk_values > CNST.NUM_50, chunk_values > CNST.NUM_100, out=level_codes[start:stop], dtype=np.int8)
+
+        list(executor.map(level_chunk, chunks))
+        self.table['Level'] = pd.Categorical.from_codes(level_codes, categories=['Low', 'Medium', 'High'])
+        self.logger.info("Column added!")
+
+    def generate_results_array_in_chunks(self, executor: concurrent.futures.Executor, chunks: List[Tuple[int, int]]):
+        """ 
+        - Same as self.generate_results_array, but both parts of the results are generated per chunk of rows on the executor.
+        - The number of entries every chunk contributes is computed first, so every chunk writes directly into
+          its own slice of a single preallocated array and no concatenation is needed.
+
+        Args:
+            executor (concurrent.futures.Executor): executor that runs the chunks
+            chunks (List[Tuple[int, int]]): (start, stop) row offsets of every chunk
+
+        Updates:
+            self.generated_results_data (np.ndarray): array stores the manipulation results
+        """
+        if len(self.table)>CNST.NUM_1K:
+            self.logger.info(CNST.LOG_SEP)
+            self.logger.warning(f"Data of {len(self.table)} entries is too large for any sensible manipulation.") 
+            self.logger.info(CNST.LOG_SEP)
+
+        values = self.table[CNST.COL_NAME].to_numpy()
+        use_row_parity = len(values) > CNST.NUM_50
+
+        def count_chunk(chunk):
+            start, stop = chunk
+            return (count_first_part_entries(values[start:stop], start, use_row_parity),
+                    count_second_part_entries(values[start:stop]))
+
+        chunks_counts = list(executor.map(count_chunk, chunks))
+        first_part_sizes = [int(first.sum()) for first, _ in chunks_counts]
+        second_part_sizes = [int(second.sum()) for _, second in chunks_counts]
+        first_part_offsets = np.concatenate(([0], np.cumsum(first_part_sizes)))
+        second_part_offsets = first_part_offsets[-1] + np.concatenate(([0], np.cumsum(second_part_sizes)))
+        results = np.empty(second_part_offsets[-1], dtype=np.float64)
+
+        def fill_chunk(chunk_number):
+            start, stop = chunks[chunk_number]
+            first_counts, second_counts = chunks_counts[chunk_number]
+            fill_first_part_chunk(results[first_part_offsets[chunk_number]:first_part_offsets[chunk_number + 1]],
+                                  values[start:stop], first_counts, use_row_parity)
+            fill_second_part_chunk(results[second_part_offsets[chunk_number]:second_part_offsets[chunk_number + 1]],
+                                   values[start:stop], second_counts)
+
+        list(executor.map(fill_chunk, range(len(chunks))))
+        self.generated_results_data = results
+
+        def count_results_chunk(chunk):
+            start, stop = chunk
+            return np.sum(results[start:stop] > CNST.NUM_1K), np.sum(results[start:stop] < CNST.NUM_10)
+
+        results_chunks = split_rows_into_chunks(len(results), max(1, -(-len(results) // len(chunks))))
+        results_counts = list(executor.map(count_results_chunk, results_chunks))
+        self.write_results_range_counts(sum(large for large, _ in results_counts), sum(small for _, small in results_counts))
+
+    def log_values_range_counts_in_chunks(self, executor: concurrent.futures.Executor, chunks: List[Tuple[int, int]]):
+        """ 
+        - Same as self.log_values_range_counts, but the values of every chunk of rows are counted on the executor.
+
+        Args:
+            executor (concurrent.futures.Executor): executor that runs the chunks
+            chunks (List[Tuple[int, int]]): (start, stop) row offsets of every chunk
+        """
+        values = self.table[CNST.COL_NAME].to_numpy()
+
+        def count_chunk(chunk):
+            start, stop = chunk
+            chunk_values = values[start:stop]
+            return np.array([np.sum(chunk_values > 10),
+                             np.sum((5 < chunk_values) & (chunk_values < 10)),
+                             np.sum((0 < chunk_values) & (chunk_values < 5)),
+                             np.sum(chunk_values < 0)])
+
+        counts = sum(executor.map(count_chunk, chunks))
+        self.write_values_range_counts(*counts.tolist())
+
+    def run_manipulation_methods_in_chunks(self, num_workers: int, chunk_size: int = CNST.CHUNK_ROWS):
+        """ 
+        - Same steps as self.run_manipulation_methods, but one table is split into chunks of rows
+          that are processed in parallel by a thread pool. Intended for single very large files.
+        - NumPy kernels release the GIL, so the chunks of a single file run on several cores.
+        - Results match self.run_manipulation_methods: every chunk knows its global starting row, so
+          even/odd row parity and filter indices are the same.
+
+        Args:
+            num_workers (int): number of threads
+            chunk_size (int): maximum number of rows per chunk
+        """
+        if not self.table.empty:
+            chunks = split_rows_into_chunks(len(self.table), chunk_size)
+            with concurrent.futures.ThreadPoolExecutor(max_workers= num_workers) as executor:
+                self.filter_data_in_chunks(executor, chunks, filter_threshold=CNST.FILTER_THRESH)
+                self.add_level_column_in_chunks(executor, chunks)
+                self.generate_results_array_in_chunks(executor, chunks)
+                self.log_values_range_counts_in_chunks(executor, chunks)
+            self.completed_run = True 
+            return 
+        self.logger.warning("No data to process!")
+        self.completed_run = True 
+
     @staticmethod
-    def process_dataset_in_parallel(files_dir: str, num_workers: int) -> List[List] :
+    def process_one_file(file_path: str, governor: MemoryGovernor = None, on_admitted: Callable[[], None] = None) -> 'ArrowDatasetManipulation':
+        """
+        - Loads one file and runs the manipulation methods on it.
+        - If a memory governor is given, the file waits until its estimated memory fits the budget,
+          and files larger than the budget are processed in chunks.
+
+        Args:
+            file_path (str): path for data file
+            governor (MemoryGovernor): optional memory governor shared by the files processed in parallel
+            on_admitted (Callable[[], None]): optional function called when processing starts,
+                                              after the file is admitted by the governor
+
+        Returns:
+            (ArrowDatasetManipulation): the processed dataset
+        """
+        if governor is None:
+            if on_admitted is not None:
+                on_admitted()
+            dataset_new = ArrowDatasetManipulation(file_path)
+            dataset_new.run_manipulation_methods()
+            return dataset_new
+
+        estimate, use_chunks = governor.estimate_file_memory(file_path)
+        governor.acquire(estimate)
+        try:
+            if on_admitted is not None:
+                on_admitted()
+            dataset_new = ArrowDatasetManipulation(file_path)
+            if use_chunks:
+                dataset_new.logger.info(f"File is larger than the memory budget, processing it in chunks of {CNST.CHUNK_ROWS} rows.")
+                dataset_new.run_manipulation_methods_in_chunks(num_workers=1)
+            else:
+                dataset_new.run_manipulation_methods()
+            return dataset_new
+        finally:
+            governor.release(estimate)
+
+    @staticmethod
+    def process_dataset_in_parallel(files_dir: str, num_workers: int, memory_budget: int = None) -> List[List] :
         """
         This function parallelizes the code with multi-threading to manipulate multiple files in parallel 
 
         Args:
             files_dir (str): path to the directory that contains the files to be processed in parallel 
             num_workers (int): number of workers
+            memory_budget (int): if given, maximum estimated memory in bytes used by files processed at the same time,
+                                 see MemoryGovernor. Files larger than the budget are processed in chunks.
 
         Returns: 
             (List[[bool, str]]): each entry contains a bool to flag manipulation failures along with the file path
@@ -327,12 +836,10 @@ class ArrowDatasetManipulation:
         files_paths = glob.glob(f'{files_dir}*')
 
         print(f'Running on {len(files_paths)} files.')
-    
+        governor = MemoryGovernor(memory_budget) if memory_budget is not None else None
 
         def process_one_file(file_path):
-            dataset_new = ArrowDatasetManipulation(file_path)
-            dataset_new.run_manipulation_methods()
-            return dataset_new.completed_run
+            return ArrowDatasetManipulation.process_one_file(file_path, governor).completed_run
 
         results_list = []
 
@@ -342,7 +849,116 @@ class ArrowDatasetManipulation:
             futures_dict = {executor.submit(process_one_file, file_path=file_path): file_path for file_path in files_paths}
             for future in concurrent.futures.as_completed(futures_dict):
                 results_list.append([future.result(), futures_dict[future]])
+
+        if governor is not None:
+            print(governor.report())
         return results_list
+
+    @staticmethod
+    def iterate_dataset_in_parallel(files_dir: str, num_workers: int, file_timeout: float = None, max_retries: int = 0,
+                                    memory_budget: int = None) -> Iterator[FileOutcome]:
+        """
+        - Same as process_dataset_in_parallel, but yields the outcome of every file as soon as it completes,
+          so results can be used before the slowest file finishes.
+        - Errors are captured per file in FileOutcome.error instead of stopping the other files.
+        - Files that raise an error are processed again up to max_retries times.
+        - A file that runs for longer than file_timeout seconds is yielded with a TimeoutError. Threads cannot be
+          stopped, so its thread finishes in the background and its result is dropped. It is not retried.
+          Time spent waiting for the memory budget does not count toward file_timeout or FileOutcome.elapsed_seconds.
+        - Closing the generator (e.g. breaking out of the loop) cancels the files that have not started yet.
+        - With a memory budget, the MemoryGovernor report is logged when the generator ends.
+
+        Args:
+            files_dir (str): path to the directory that contains the files to be processed in parallel 
+            num_workers (int): number of workers
+            file_timeout (float): maximum processing time in seconds of one file, None for no limit
+            max_retries (int): number of times a file that raised an error is processed again
+            memory_budget (int): if given, maximum estimated memory in bytes used by files processed at the same time,
+                                 see MemoryGovernor
+
+        Yields: 
+            (FileOutcome): the outcome of every file, in order of completion
+        """
+        files_paths = glob.glob(f'{files_dir}*')
+        yield from ArrowDatasetManipulation.iterate_files_in_parallel(files_paths, num_workers, file_timeout=file_timeout,
+                                                                      max_retries=max_retries, memory_budget=memory_budget)
+
+    @staticmethod
+    def iterate_files_in_parallel(files_paths: List[str], num_workers: int = None, file_timeout: float = None, max_retries: int = 0,
+                                  memory_budget: int = None, executor: concurrent.futures.Executor = None,
+                                  governor: MemoryGovernor = None) -> Iterator[FileOutcome]:
+        """
+        - Same as iterate_dataset_in_parallel, for a given list of files.
+        - If an executor is given, the files run on it and it is left running when the generator ends,
+          so one warm executor can serve many calls.
+        - If a governor is given, it is used instead of memory_budget, so one budget can be shared by many calls.
+
+        Args:
+            files_paths (List[str]): paths of the files to be processed in parallel
+            num_workers (int): number of workers, not used if an executor is given
+            file_timeout (float): maximum processing time in seconds of one file, None for no limit
+            max_retries (int): number of times a file that raised an error is processed again
+            memory_budget (int): if given, maximum estimated memory in bytes used by files processed at the same time,
+                                 see MemoryGovernor
+            executor (concurrent.futures.Executor): optional executor that runs the files
+            governor (MemoryGovernor): optional memory governor shared with other calls
+
+        Yields: 
+            (FileOutcome): the outcome of every file, in order of completion
+        """
+        owns_executor = executor is None
+        if owns_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers= num_workers)
+        if governor is None and memory_budget is not None:
+            governor = MemoryGovernor(memory_budget)
+        # future -> (file path, attempt number, start time once the attempt is admitted and running)
+        pending = {}
+
+        def submit(file_path, attempt):
+            start_time = []
+
+            def process_one_file():
+                return ArrowDatasetManipulation.process_one_file(file_path, governor,
+                                                                 on_admitted=lambda: start_time.append(time.monotonic()))
+
+            pending[executor.submit(process_one_file)] = (file_path, attempt, start_time)
+
+        try:
+            for file_path in files_paths:
+                submit(file_path, 1)
+
+            while pending:
+                done, _ = concurrent.futures.wait(pending, timeout=CNST.POLL_SECONDS if file_timeout is not None else None,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    file_path, attempt, start_time = pending.pop(future)
+                    # an attempt that failed before it was admitted has no start time
+                    elapsed_seconds = time.monotonic() - start_time[0] if start_time else 0.0
+                    try:
+                        dataset_new = future.result()
+                    except Exception as e:
+                        if attempt <= max_retries:
+                            submit(file_path, attempt + 1)
+                            continue
+                        yield FileOutcome(file_path, attempt, elapsed_seconds, error=e)
+                        continue
+                    yield FileOutcome(file_path, attempt, elapsed_seconds, dataset=dataset_new)
+
+                if file_timeout is None:
+                    continue
+                now = time.monotonic()
+                for future, (file_path, attempt, start_time) in list(pending.items()):
+                    if start_time and now - start_time[0] > file_timeout and not future.done():
+                        del pending[future]
+                        yield FileOutcome(file_path, attempt, now - start_time[0],
+                                          error=TimeoutError(f"Processing {file_path} took longer than {file_timeout} seconds"))
+        finally:
+            for future in pending:
+                future.cancel()
+            if owns_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if governor is not None:
+                logging.getLogger(__name__).info(governor.report())
        
 
 
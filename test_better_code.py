@@ -3,6 +3,11 @@ import better_code
 import code_1
 import time
 import glob
+import threading
+import tempfile
+import shutil
+import os
+from unittest import mock
 import numpy as np
 
 class TestBetterCode(unittest.TestCase):
@@ -108,5 +113,240 @@ class TestBetterCode(unittest.TestCase):
         assert len(failed_cases)==0, f'Failed to run on files: {failed_cases}'
 
 
+    def test_parallel_execution_with_memory_budget(self):
+        """
+        Tests multithreading on an entire dataset with a memory budget that is too small for the larger files,
+        so those are processed in chunks.
+        """
+        files_dir = './runtime_test_files/'
+        memory_budget = 8*better_code.CNST.MB
+        governors = []
+        class RecordingGovernor(better_code.MemoryGovernor):
+            def __init__(self, memory_budget):
+                super().__init__(memory_budget)
+                governors.append(self)
+
+        chunked_paths = []
+        run_in_chunks = better_code.ArrowDatasetManipulation.run_manipulation_methods_in_chunks
+        def record_chunked_run(dataset, *args, **kwargs):
+            chunked_paths.append(dataset.file_path)
+            return run_in_chunks(dataset, *args, **kwargs)
+
+        with mock.patch.object(better_code, 'MemoryGovernor', RecordingGovernor), \
+             mock.patch.object(better_code.ArrowDatasetManipulation, 'run_manipulation_methods_in_chunks', autospec=True, side_effect=record_chunked_run):
+            results = better_code.ArrowDatasetManipulation.process_dataset_in_parallel(files_dir=files_dir,num_workers=5,memory_budget=memory_budget)
+
+        failed_cases = [x[1] for x in results if not x[0]]
+        files_paths = glob.glob(f'{files_dir}*')
+        expected_chunked_paths = [x for x in files_paths if governors[0].estimate_file_memory(x)[1]]
+
+        assert len(results) == len(files_paths)
+        assert len(failed_cases)==0, f'Failed to run on files: {failed_cases}'
+        assert len(expected_chunked_paths) > 0 and len(expected_chunked_paths) < len(files_paths)
+        assert sorted(chunked_paths) == sorted(expected_chunked_paths)
+        assert 0 < governors[0].peak_reserved <= memory_budget
+        assert governors[0].reserved == 0
+
+
+    def test_streaming_execution(self):
+        """
+        Tests that the outcome of every file is yielded, with its results.
+        """
+        files_dir = './runtime_test_files/'
+        outcomes = list(better_code.ArrowDatasetManipulation.iterate_dataset_in_parallel(files_dir=files_dir, num_workers=5))
+
+        failed_cases = [x.file_path for x in outcomes if not x.succeeded]
+
+        assert sorted(x.file_path for x in outcomes) == sorted(glob.glob(f'{files_dir}*'))
+        assert len(failed_cases)==0, f'Failed to run on files: {failed_cases}'
+        outcome = next(x for x in outcomes if x.file_path.endswith('test_file_size_100.csv'))
+        dataset_new = better_code.ArrowDatasetManipulation(outcome.file_path)
+        dataset_new.run_manipulation_methods()
+        assert np.array_equal(outcome.generated_results_data, dataset_new.generated_results_data)
+
+
+    def test_streaming_execution_errors_and_retries(self):
+        """
+        Tests that a file that cannot be read is retried, and reported without stopping the other files.
+        """
+        with tempfile.TemporaryDirectory() as files_dir:
+            shutil.copy('runtime_test_files/test_file_size_100.csv', files_dir)
+            with open(os.path.join(files_dir, 'unknown_type.txt'), 'w') as f:
+                f.write('value\n1\n')
+
+            outcomes = list(better_code.ArrowDatasetManipulation.iterate_dataset_in_parallel(files_dir=files_dir+'/', num_workers=2, max_retries=2))
+
+        outcomes = {os.path.basename(x.file_path): x for x in outcomes}
+        assert outcomes['test_file_size_100.csv'].succeeded
+        assert not outcomes['unknown_type.txt'].succeeded
+        assert isinstance(outcomes['unknown_type.txt'].error, ValueError)
+        assert outcomes['unknown_type.txt'].attempts == 3
+
+
+    def test_streaming_execution_timeout_and_cancel(self):
+        """
+        Tests that a file running past the timeout is reported, and that closing the generator
+        cancels the files that have not started.
+        """
+        def slow_process_one_file(file_path, governor=None, on_admitted=None):
+            on_admitted()
+            time.sleep(1)
+
+        with mock.patch.object(better_code.ArrowDatasetManipulation, 'process_one_file', side_effect=slow_process_one_file) as process_one_file:
+            outcomes = better_code.ArrowDatasetManipulation.iterate_dataset_in_parallel(files_dir='./runtime_test_files/', num_workers=1, file_timeout=0.2)
+            start_time = time.time()
+            outcome = next(outcomes)
+            outcomes.close()
+            close_seconds = time.time() - start_time
+            # the only worker is free again once the first file finishes, so it would pick up any file left queued
+            time.sleep(1.5)
+            call_count = process_one_file.call_count
+
+        assert isinstance(outcome.error, TimeoutError)
+        assert close_seconds < 1
+        assert len(glob.glob('./runtime_test_files/*')) > 1
+        assert call_count == 1, f"{call_count - 1} files started after the generator was closed"
+
+
+    def test_streaming_execution_timeout_with_memory_budget(self):
+        """
+        Tests that time spent waiting for the memory budget does not count toward the timeout,
+        and that the memory governor report is logged.
+        The budget admits one file at a time, so the second file waits for the first before it runs.
+        """
+        def slow_run(dataset):
+            time.sleep(0.5)
+            dataset.completed_run = True
+
+        with tempfile.TemporaryDirectory() as files_dir:
+            for name in ('first.csv', 'second.csv'):
+                shutil.copy('runtime_test_files/test_file_size_5000.csv', os.path.join(files_dir, name))
+            estimate, _ = better_code.MemoryGovernor(memory_budget=1024*better_code.CNST.MB).estimate_file_memory(os.path.join(files_dir, 'first.csv'))
+
+            with mock.patch.object(better_code.ArrowDatasetManipulation, 'run_manipulation_methods', autospec=True, side_effect=slow_run), \
+                 self.assertLogs('better_code', level='INFO') as logs:
+                start_time = time.time()
+                outcomes = list(better_code.ArrowDatasetManipulation.iterate_dataset_in_parallel(files_dir=files_dir+'/', num_workers=2,
+                                                                                                 file_timeout=0.8, memory_budget=int(1.5*estimate)))
+                total_seconds = time.time() - start_time
+
+        assert [x.error for x in outcomes] == [None, None]
+        assert any('estimated peak' in x for x in logs.output), "The memory governor report was not logged"
+        assert all(x.succeeded for x in outcomes)
+        assert all(x.elapsed_seconds < 0.8 for x in outcomes)
+        assert total_seconds >= 1, "Files were not admitted one at a time"
+
+
+    def test_memory_governor_admission(self):
+        """
+        Tests that the memory governor only admits work that fits the budget, and admits
+        work larger than the budget when nothing else is running.
+        """
+        governor = better_code.MemoryGovernor(memory_budget=100)
+        governor.acquire(60)
+
+        admitted = threading.Event()
+        def acquire_and_flag():
+            governor.acquire(60)
+            admitted.set()
+        waiting_thread = threading.Thread(target=acquire_and_flag)
+        waiting_thread.start()
+
+        assert not admitted.wait(timeout=0.2), "Work that does not fit the budget was admitted"
+        governor.release(60)
+        assert admitted.wait(timeout=5), "Work was not admitted after memory was released"
+        waiting_thread.join()
+        governor.release(60)
+
+        governor.acquire(500)
+        assert governor.peak_reserved == 500
+        governor.release(500)
+        assert governor.reserved == 0
+
+
+    def test_memory_governor_first_in_first_out(self):
+        """
+        Tests that work larger than the budget is not overtaken by smaller work that asked after it.
+        """
+        governor = better_code.MemoryGovernor(memory_budget=100)
+        governor.acquire(60)
+
+        admitted = []
+        def acquire_and_record(estimate):
+            governor.acquire(estimate)
+            admitted.append(estimate)
+        large_thread = threading.Thread(target=acquire_and_record, args=(500,), daemon=True)
+        large_thread.start()
+        while governor.next_ticket < 2:
+            time.sleep(0.01)
+        small_thread = threading.Thread(target=acquire_and_record, args=(10,), daemon=True)
+        small_thread.start()
+
+        small_thread.join(timeout=0.2)
+        assert admitted == [], "Smaller work overtook work that asked before it"
+        governor.release(60)
+        large_thread.join(timeout=5)
+        small_thread.join(timeout=0.2)
+        assert admitted == [500], "Smaller work was admitted while work larger than the budget was running"
+        governor.release(500)
+        small_thread.join(timeout=5)
+        assert admitted == [500, 10]
+        governor.release(10)
+        assert governor.reserved == 0
+
+
+    def test_chunked_execution_matching_one_file(self):
+        """
+        Testing that processing one file in chunks of rows matches processing it at once.
+        An odd chunk size makes chunks start on both even and odd rows.
+        """
+        file_path = 'runtime_test_files/test_file_size_5000.csv'
+        dataset_new = better_code.ArrowDatasetManipulation(file_path)
+        dataset_new.run_manipulation_methods()
+
+        dataset_chunked = better_code.ArrowDatasetManipulation(file_path)
+        dataset_chunked.run_manipulation_methods_in_chunks(num_workers=4, chunk_size=333)
+
+        assert dataset_chunked.completed_run
+        assert np.array_equal(dataset_new.generated_results_data, dataset_chunked.generated_results_data), f"The values of the results array generated in chunks do not match"
+        assert dataset_new.indices_matching_filter == dataset_chunked.indices_matching_filter
+        assert (dataset_new.table['Level'] == dataset_chunked.table['Level']).all()
+
+
+    def test_chunked_execution_matching_small_file(self):
+        """
+        Testing that processing a file of at most 50 entries in chunks matches processing it at once.
+        Such files do not use the row parity, and the values are on the boundaries of the rules.
+        """
+        values = [4, 5, 9, 10, 200, 201, -3, 0, 50, 100, 101, 42, 41]
+        with tempfile.TemporaryDirectory() as files_dir:
+            file_path = os.path.join(files_dir, 'small_file.csv')
+            with open(file_path, 'w') as f:
+                f.write('value\n' + '\n'.join(str(x) for x in values) + '\n')
+
+            dataset_new = better_code.ArrowDatasetManipulation(file_path)
+            dataset_new.run_manipulation_methods()
+            for chunk_size in (1, 7):
+                dataset_chunked = better_code.ArrowDatasetManipulation(file_path)
+                dataset_chunked.run_manipulation_methods_in_chunks(num_workers=4, chunk_size=chunk_size)
+
+                assert np.array_equal(dataset_new.generated_results_data, dataset_chunked.generated_results_data), f"The values of the results array generated in chunks of {chunk_size} do not match"
+                assert dataset_new.indices_matching_filter == dataset_chunked.indices_matching_filter
+                assert (dataset_new.table['Level'] == dataset_chunked.table['Level']).all()
+
+
+    def test_chunked_execution_empty_file(self):
+        """
+        Testing passing an empty file to the chunked execution
+        """
+        file_path = 'runtime_test_files/test_file_size_0.csv'
+
+        dataset_chunked = better_code.ArrowDatasetManipulation(file_path)
+        dataset_chunked.run_manipulation_methods_in_chunks(num_workers=4)
+
+        assert dataset_chunked.completed_run
+        assert dataset_chunked.generated_results_data is None
+
+
 if __name__ == "__main__": 
     unittest.main()
\ No newline at end of file
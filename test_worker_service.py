@@ -0,0 +1,166 @@
+import unittest
+import better_code
+import worker_service
+import glob
+import os
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
+import numpy as np
+
+class TestWorkerService(unittest.TestCase):
+
+    def setUp(self):
+        self.socket_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.socket_dir.name, 'workers.sock')
+        self.service = worker_service.WorkerService(self.socket_path, num_workers=4)
+        self.service_thread = threading.Thread(target=self.service.serve_forever)
+        self.service_thread.start()
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.service_thread.join()
+        self.service.server_close()
+        self.socket_dir.cleanup()
+
+    def test_submit_file(self):
+        """
+        Testing that the results sent back by the service match processing the file directly.
+        """
+        file_path = 'runtime_test_files/test_file_size_100.csv'
+        reply = worker_service.submit_job(file_path, self.socket_path)
+
+        dataset_new = better_code.ArrowDatasetManipulation(file_path)
+        dataset_new.run_manipulation_methods()
+
+        assert len(reply['outcomes']) == 1
+        assert reply['outcomes'][0]['succeeded']
+        assert np.array_equal(np.array(reply['outcomes'][0]['results']), dataset_new.generated_results_data)
+
+    def test_submit_directory_with_output_dir(self):
+        """
+        Testing a directory job where the results arrays are saved to an output directory.
+        """
+        files_dir = './runtime_test_files/'
+        with tempfile.TemporaryDirectory() as output_dir:
+            reply = worker_service.submit_job(files_dir, self.socket_path, output_dir=output_dir)
+
+            failed_cases = [x['file_path'] for x in reply['outcomes'] if not x['succeeded']]
+            results_paths = [x['results_path'] for x in reply['outcomes'] if 'results_path' in x]
+            assert len(reply['outcomes']) == len(glob.glob(f'{files_dir}*'))
+            assert len(failed_cases)==0, f'Failed to run on files: {failed_cases}'
+            assert len(set(results_paths)) == len(results_paths), "Files were saved to the same results path"
+            assert all(os.path.isfile(x) for x in results_paths)
+
+    def test_submit_directory_with_csv_and_parquet(self):
+        """
+        Testing that a csv and a parquet file with the same name are saved to different results files.
+        """
+        with tempfile.TemporaryDirectory() as files_dir, tempfile.TemporaryDirectory() as output_dir:
+            shutil.copy('runtime_test_files/test_file_size_1000.csv', files_dir)
+            shutil.copy('runtime_test_files_parquet/test_file_size_1000.parquet', files_dir)
+            reply = worker_service.submit_job(files_dir, self.socket_path, output_dir=output_dir)
+
+            results_paths = [x['results_path'] for x in reply['outcomes']]
+            assert all(x['succeeded'] for x in reply['outcomes'])
+            assert len(set(results_paths)) == 2, "Files were saved to the same results path"
+            csv_results, parquet_results = (np.load(os.path.join(output_dir, f'test_file_size_1000.{x}.npy')) for x in ('csv', 'parquet'))
+            assert np.array_equal(csv_results, parquet_results)
+
+    def test_memory_budget_shared_by_jobs(self):
+        """
+        Testing that jobs submitted at the same time share the memory budget of the service.
+        The budget fits one file, so the files of the two jobs are admitted one at a time.
+        """
+        file_path = 'runtime_test_files/test_file_size_5000.csv'
+        estimate, _ = better_code.MemoryGovernor(memory_budget=1024*better_code.CNST.MB).estimate_file_memory(file_path)
+        memory_budget = int(1.5*estimate)
+        socket_path = os.path.join(self.socket_dir.name, 'budget.sock')
+        service = worker_service.WorkerService(socket_path, num_workers=4, memory_budget=memory_budget)
+        service_thread = threading.Thread(target=service.serve_forever)
+        service_thread.start()
+
+        replies = []
+        jobs = [threading.Thread(target=lambda: replies.append(worker_service.submit_job(file_path, socket_path))) for _ in range(2)]
+        for job in jobs:
+            job.start()
+        for job in jobs:
+            job.join()
+        service.shutdown()
+        service_thread.join()
+        service.server_close()
+
+        assert len(replies) == 2
+        assert all(x['outcomes'][0]['succeeded'] for x in replies)
+        assert service.governor.peak_reserved == estimate
+        assert service.governor.reserved == 0
+
+    def test_refuse_socket_of_running_service(self):
+        """
+        Testing that a second service does not take over the socket of a running service.
+        """
+        with self.assertRaises(FileExistsError):
+            worker_service.WorkerService(self.socket_path)
+
+        reply = worker_service.submit_job('runtime_test_files/test_file_size_100.csv', self.socket_path)
+        assert reply['outcomes'][0]['succeeded']
+
+    def test_replace_socket_left_behind(self):
+        """
+        Testing that a socket file left behind by a stopped service is replaced.
+        """
+        socket_path = os.path.join(self.socket_dir.name, 'left_behind.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as left_behind:
+            left_behind.bind(socket_path)
+        assert not worker_service.is_service_listening(socket_path)
+
+        service = worker_service.WorkerService(socket_path)
+        service.server_close()
+
+    def test_socket_is_private_to_owner(self):
+        """
+        Testing that only the owner can connect to the socket, whatever the umask.
+        """
+        socket_path = os.path.join(self.socket_dir.name, 'private.sock')
+        previous_umask = os.umask(0o002)
+        try:
+            service = worker_service.WorkerService(socket_path)
+        finally:
+            os.umask(previous_umask)
+        socket_mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+        service.server_close()
+
+        assert socket_mode == 0o600, f'The socket mode is {oct(socket_mode)}'
+
+    def test_default_socket_path_is_per_user(self):
+        """
+        Testing that the default socket path is in $XDG_RUNTIME_DIR, or includes the user id otherwise.
+        """
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': self.socket_dir.name}):
+            assert worker_service.get_default_socket_path() == os.path.join(self.socket_dir.name, 'arrow_dataset_manipulation.sock')
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            assert str(os.getuid()) in os.path.basename(worker_service.get_default_socket_path())
+
+    def test_submit_missing_path(self):
+        """
+        Testing that a job with a path that does not exist gets an error reply.
+        """
+        reply = worker_service.submit_job('runtime_test_files/missing.csv', self.socket_path)
+        assert 'FileNotFoundError' in reply['error']
+
+    def test_lazy_imports(self):
+        """
+        Testing that importing the modules does not import pandas or pyarrow.
+        """
+        loaded = subprocess.run([sys.executable, '-c', 'import better_code, worker_service, sys; print("pandas" in sys.modules or "pyarrow" in sys.modules)'],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        assert loaded == 'False'
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+"""
+A long-lived local service that keeps warm workers for better_code.ArrowDatasetManipulation.
+
+Importing pandas and pyarrow costs more than processing a small file, so the service imports them once
+and keeps a thread pool running. Jobs are sent over a Unix socket, one JSON line per request and one per reply.
+The client side only needs the standard library, so submitting a job starts fast.
+
+Usage:
+    python worker_service.py serve --workers 4
+    python worker_service.py submit ./runtime_test_files/ --output-dir ./results/
+"""
+
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+
+
+def get_default_socket_path() -> str:
+    """
+    - Returns a socket path private to the current user: in $XDG_RUNTIME_DIR if it is set,
+      otherwise in the temporary directory with the user id in the file name.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'arrow_dataset_manipulation.sock')
+    return os.path.join(tempfile.gettempdir(), f'arrow_dataset_manipulation-{os.getuid()}.sock')
+
+
+DEFAULT_SOCKET_PATH = get_default_socket_path()
+
+
+def is_service_listening(socket_path: str) -> bool:
+    """
+    - Checks whether a service accepts connections on a socket path.
+
+    Args:
+        socket_path (str): path of the Unix socket
+
+    Returns:
+        (bool): True if a service is listening, False if the socket file is missing or left behind
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one connection: reads one job as a JSON line and writes the reply as a JSON line.
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        # connections without a job, e.g. is_service_listening, get no reply
+        if not line:
+            return
+        try:
+            job = json.loads(line)
+            reply = self.server.run_job(job)
+        except Exception as e:
+            reply = {'error': f'{type(e).__name__}: {e}'}
+        self.wfile.write((json.dumps(reply) + '\n').encode())
+
+
+class WorkerService(socketserver.ThreadingUnixStreamServer):
+    """
+    A Unix socket server that processes data files on a warm pool of workers.
+    Attributes:
+        socket_path (str): path of the Unix socket the service listens on
+        executor (concurrent.futures.ThreadPoolExecutor): the warm pool shared by all jobs
+        governor (better_code.MemoryGovernor): memory governor shared by all jobs, None if the service has no budget
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, num_workers: int = None, memory_budget: int = None):
+        """
+        - Imports the data backends and starts the pool, so the first job does not pay for them.
+        - Removes a socket file left behind by a previous service. Raises FileExistsError if a service
+          is still listening on socket_path, or if socket_path is not a socket.
+
+        Args:
+            socket_path (str): path of the Unix socket to listen on
+            num_workers (int): number of workers in the pool
+            memory_budget (int): if given, maximum estimated memory in bytes used by the files of all jobs
+                                 processed at the same time, see better_code.MemoryGovernor
+        """
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise FileExistsError(f"{socket_path} exists and is not a socket")
+            if is_service_listening(socket_path):
+                raise FileExistsError(f"A service is already listening on {socket_path}")
+            os.unlink(socket_path)
+
+        import concurrent.futures
+        import pyarrow.csv
+        import pyarrow.parquet
+        import pandas
+        import better_code
+        self.better_code = better_code
+
+        self.socket_path = socket_path
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers= num_workers)
+        self.governor = better_code.MemoryGovernor(memory_budget) if memory_budget is not None else None
+        super().__init__(socket_path, JobHandler)
+
+    def server_bind(self):
+        """
+        - Binds the socket and makes it private to the owner of the service. Jobs can read and write any
+          file the owner can, so other users must not connect. The socket is not listening yet, so no one
+          can connect before its mode is changed.
+        """
+        super().server_bind()
+        os.chmod(self.socket_path, 0o600)
+
+    def run_job(self, job: dict) -> dict:
+        """
+        - Processes a file, or every file in a directory, on the warm pool.
+        - If the service has a memory budget, all jobs share it and the budget of the job is not used.
+          Otherwise a budget sent with the job only limits the files of that job.
+
+        Args:
+            job (dict): the job sent by the client, see submit_job
+
+        Returns:
+            (dict): the reply, with an entry per file under "outcomes"
+        """
+        path = job['path']
+        if os.path.isdir(path):
+            files_paths = sorted(os.path.join(path, name) for name in os.listdir(path))
+        elif os.path.isfile(path):
+            files_paths = [path]
+        else:
+            raise FileNotFoundError(path)
+
+        output_dir = job.get('output_dir')
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        outcomes = self.better_code.ArrowDatasetManipulation.iterate_files_in_parallel(
+            files_paths, file_timeout=job.get('file_timeout'), max_retries=job.get('max_retries', 0),
+            memory_budget=job.get('memory_budget'), executor=self.executor, governor=self.governor)
+        return {'outcomes': [self.describe_outcome(outcome, output_dir) for outcome in outcomes]}
+
+    @staticmethod
+    def describe_outcome(outcome, output_dir: str = None) -> dict:
+        """
+        - Converts a FileOutcome to JSON. The results array is saved as <file name>.npy if an output
+          directory is given, and sent back as a list otherwise.
+
+        Args:
+            outcome (better_code.FileOutcome): the outcome of one file
+            output_dir (str): optional directory where the results arrays are saved
+
+        Returns:
+            (dict): the JSON description of the outcome
+        """
+        import numpy as np
+
+        description = {'file_path': outcome.file_path,
+                       'succeeded': outcome.succeeded,
+                       'attempts': outcome.attempts,
+                       'elapsed_seconds': outcome.elapsed_seconds,
+                       'error': None if outcome.error is None else f'{type(outcome.error).__name__}: {outcome.error}'}
+        if outcome.generated_results_data is None:
+            return description
+        if output_dir is None:
+            description['results'] = outcome.generated_results_data.tolist()
+            return description
+        # keep the source extension, so x.csv and x.parquet do not write to the same file
+        results_path = os.path.join(output_dir, os.path.basename(outcome.file_path) + '.npy')
+        np.save(results_path, outcome.generated_results_data)
+        description['results_path'] = results_path
+        return description
+
+    def server_close(self):
+        """
+        - Stops the pool and removes the socket file.
+        """
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def submit_job(path: str, socket_path: str = DEFAULT_SOCKET_PATH, output_dir: str = None, file_timeout: float = None,
+               max_retries: int = 0, memory_budget: int = None) -> dict:
+    """
+    - Sends a job to a running WorkerService and waits for the reply.
+
+    Args:
+        path (str): path of a data file, or of a directory of data files
+        socket_path (str): path of the Unix socket of the service
+        output_dir (str): if given, the results arrays are saved there as .npy files instead of being sent back
+        file_timeout (float): maximum processing time in seconds of one file, None for no limit
+        max_retries (int): number of times a file that raised an error is processed again
+        memory_budget (int): if given, maximum estimated memory in bytes used by the files of this job processed
+                             at the same time. Not used if the service was started with its own budget.
+
+    Returns:
+        (dict): the reply of the service, with an entry per file under "outcomes", or an "error"
+    """
+    job = {'path': os.path.abspath(path),
+           'output_dir': None if output_dir is None else os.path.abspath(output_dir),
+           'file_timeout': file_timeout,
+           'max_retries': max_retries,
+           'memory_budget': memory_budget}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(job) + '\n').encode())
+        with client.makefile('rb') as reply:
+            return json.loads(reply.readline())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Warm worker service for ArrowDatasetManipulation.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='path of the Unix socket')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='start the service')
+    serve_parser.add_argument('--workers', type=int, default=None, help='number of workers')
+    serve_parser.add_argument('--memory-budget', type=int, default=None, help='memory budget in bytes shared by all jobs')
+
+    submit_parser = commands.add_parser('submit', help='send a file or a directory to the service')
+    submit_parser.add_argument('path', help='data file or directory of data files')
+    submit_parser.add_argument('--output-dir', default=None, help='save the results arrays there as .npy files')
+    submit_parser.add_argument('--file-timeout', type=float, default=None, help='maximum seconds per file')
+    submit_parser.add_argument('--max-retries', type=int, default=0, help='retries of a file that failed')
+    submit_parser.add_argument('--memory-budget', type=int, default=None, help='memory budget in bytes of this job, if the service has none')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        with WorkerService(args.socket, args.workers, memory_budget=args.memory_budget) as service:
+            print(f'Serving on {args.socket}')
+            try:
+                service.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    else:
+        reply = submit_job(args.path, args.socket, output_dir=args.output_dir, file_timeout=args.file_timeout, max_retries=args.max_retries,
+                           memory_budget=args.memory_budget)
+        if 'error' in reply:
+            raise SystemExit(reply['error'])
+        for outcome in reply['outcomes']:
+            location = outcome.get('results_path', f"{len(outcome.get('results', []))} results")
+            print(f"{outcome['file_path']}: {'done' if outcome['succeeded'] else outcome['error']} ({location})")